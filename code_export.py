@@ -1,304 +1,696 @@
 import os
-import tkinter as tk
+import sys
 import json
 import datetime
-from tkinter import ttk, filedialog, messagebox, simpledialog
 import collections
 import logging
+import time
+import contextlib
+import cProfile
+import traceback
+import gzip
+import io
+import re
+import functools
+import fnmatch
+import argparse
+import concurrent.futures
+import threading
+import http.server
+import hmac
+import ipaddress
+from xml.sax.saxutils import escape as xml_escape, quoteattr
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from watchdog.observers import Observer as WatchdogObserver
+except ImportError:
+    WatchdogObserver = None
 
 # Set up logging
 logging.basicConfig(filename="merge_errors.log", level=logging.ERROR)
 
-class FileTypeDialog(tk.Toplevel):
-    def __init__(self, parent, ignored_types):
-        super().__init__(parent)
-        self.title("Manage Ignored File Types")
-        self.geometry("400x500")
-        self.result = None
-        self.ignored_types = list(ignored_types)
-
-        # Main frame
-        main_frame = ttk.Frame(self)
-        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-        # Instructions
-        ttk.Label(main_frame, text="Manage file types to ignore:").pack(anchor=tk.W)
-
-        # Listbox with scrollbar
-        types_frame = ttk.LabelFrame(main_frame, text="Ignored Extensions")
-        types_frame.pack(fill=tk.BOTH, expand=True, pady=5)
-        scrollbar = ttk.Scrollbar(types_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.types_list = tk.Listbox(types_frame, yscrollcommand=scrollbar.set)
-        self.types_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=self.types_list.yview)
-
-        # Populate list
-        for ext in self.ignored_types:
-            self.types_list.insert(tk.END, ext)
-
-        # Button frame
-        btn_frame = ttk.Frame(main_frame)
-        btn_frame.pack(fill=tk.X, pady=5)
-        ttk.Button(btn_frame, text="Add", command=self.add_type).pack(side=tk.LEFT, padx=5)
-        ttk.Button(btn_frame, text="Remove", command=self.remove_type).pack(side=tk.LEFT, padx=5)
-
-        # Preset buttons
-        preset_frame = ttk.LabelFrame(main_frame, text="Presets")
-        preset_frame.pack(fill=tk.X, pady=5)
-        ttk.Button(preset_frame, text="Code Files",
-                   command=lambda: self.apply_preset([".py", ".js", ".html", ".css", ".java", ".cpp", ".c", ".h"])).pack(side=tk.LEFT, padx=5)
-        ttk.Button(preset_frame, text="Documents",
-                   command=lambda: self.apply_preset([".txt", ".md", ".doc", ".docx", ".pdf", ".rtf"])).pack(side=tk.LEFT, padx=5)
-        ttk.Button(preset_frame, text="Media",
-                   command=lambda: self.apply_preset([".jpg", ".jpeg", ".png", ".gif", ".mp3", ".mp4", ".wav"])).pack(side=tk.LEFT, padx=5)
-
-        # Control buttons
-        control_frame = ttk.Frame(main_frame)
-        control_frame.pack(fill=tk.X, pady=10)
-        ttk.Button(control_frame, text="Apply", command=self.apply).pack(side=tk.RIGHT, padx=5)
-        ttk.Button(control_frame, text="Cancel", command=self.cancel).pack(side=tk.RIGHT, padx=5)
-
-    def add_type(self):
-        new_type = simpledialog.askstring("Add Type", "Enter file extension (with dot, e.g. '.txt'):")
-        if new_type:
-            if not new_type.startswith("."):
-                new_type = "." + new_type
-            if new_type not in self.ignored_types:
-                self.ignored_types.append(new_type)
-                self.types_list.insert(tk.END, new_type)
-
-    def remove_type(self):
-        selected = self.types_list.curselection()
-        if selected:
-            index = selected[0]
-            ext = self.types_list.get(index)
-            self.ignored_types.remove(ext)
-            self.types_list.delete(index)
-
-    def apply_preset(self, extensions):
-        self.types_list.delete(0, tk.END)
-        self.ignored_types = extensions
-        for ext in extensions:
-            self.types_list.insert(tk.END, ext)
-
-    def apply(self):
-        self.result = self.ignored_types
-        self.destroy()
-
-    def cancel(self):
-        self.destroy()
-
-class FileMergerApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("File Merger with Tree Select")
-        self.root.geometry("800x600")
-
-        # State variables
-        self.include_line_numbers = tk.BooleanVar(value=False)
-        self.ignored_filetypes = [".scml", ".pyc", ".pyo", ".pyd"]
-        self.ignored_directories = ["__pycache__", ".git", ".vscode"]
-        self.include_ignored_in_structure = tk.BooleanVar(value=True)
-        self.include_structure = tk.BooleanVar(value=True)
-        self.check_states = {}
-        self.default_output_dir = os.getcwd()
-
-        # Menu bar
-        self.menu_bar = tk.Menu(root)
-        self.root.config(menu=self.menu_bar)
-
-        # File menu
-        self.file_menu = tk.Menu(self.menu_bar, tearoff=0)
-        self.menu_bar.add_cascade(label="File", menu=self.file_menu)
-        self.file_menu.add_command(label="Select Root Folder", command=self.select_root)
-        self.file_menu.add_command(label="Merge Files", command=self.merge_files)
-        
-        self.file_menu.add_separator()
-        self.file_menu.add_command(label="Exit", command=root.quit)
-
-        # Preferences menu
-        self.pref_menu = tk.Menu(self.menu_bar, tearoff=0)
-        self.menu_bar.add_cascade(label="Preferences", menu=self.pref_menu)
-        self.pref_menu.add_command(label="File Type Filters", command=self.edit_filetypes)
-        self.pref_menu.add_checkbutton(
-            label="Show Ignored Files in Structure",
-            variable=self.include_ignored_in_structure,
-            command=self.save_preferences)
-        self.pref_menu.add_checkbutton(label="Include File Structure",
-                                       variable=self.include_structure,
-                                       command=self.save_preferences)
-        self.pref_menu.add_checkbutton(label="Include Line Numbers",
-                                       variable=self.include_line_numbers,
-                                       command=self.save_preferences)
-        self.pref_menu.add_command(label="Set Default Output Directory", command=self.set_default_output_dir)
-
-        # Help menu
-        help_menu = tk.Menu(self.menu_bar, tearoff=0)
-        self.menu_bar.add_cascade(label="Help", menu=help_menu)
-        help_menu.add_command(label="About", command=self.show_about)
-        help_menu.add_command(label="User Guide", command=self.show_user_guide)
-
-        # Search frame
-        search_frame = ttk.Frame(root)
-        search_frame.pack(fill=tk.X, pady=5)
-        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
-        self.search_entry = ttk.Entry(search_frame)
-        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        self.search_entry.bind("<KeyRelease>", self.search_tree)
-
-        # Button frame
-        self.btn_frame = ttk.Frame(root)
-        self.btn_frame.pack(fill=tk.X, pady=5)
-        ttk.Button(self.btn_frame, text="Select Root Folder", command=self.select_root).pack(side=tk.LEFT, padx=5)
-        ttk.Button(self.btn_frame, text="Merge Files", command=self.merge_files).pack(side=tk.LEFT, padx=5)
-        ttk.Button(self.btn_frame, text="Preview Merge", command=self.preview_merge).pack(side=tk.LEFT, padx=5)
-        ttk.Button(self.btn_frame, text="Merge & Auto Save", 
-          command=self.auto_save_merge).pack(side=tk.LEFT, padx=5)
-        # Main frame (Treeview)
-        self.main_frame = ttk.Frame(root)
-        self.main_frame.pack(fill=tk.BOTH, expand=True)
-
-        # Treeview with checkboxes
-        self.tree = ttk.Treeview(self.main_frame, columns=("check"), selectmode="none")
-        self.tree.heading("#0", text="File Structure", anchor=tk.W)
-        self.tree.heading("check", text="Include")
-        self.tree.column("check", width=60, anchor="center")
-        self.tree.tag_configure('oddrow', background='lightgray')
-        self.tree.tag_configure('evenrow', background='white')
-        self.tree.tag_configure("highlight", background="yellow")
-
-        # Scrollbar
-        self.scroll = ttk.Scrollbar(self.main_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=self.scroll.set)
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
-
-        # Status bar
-        self.status_var = tk.StringVar()
-        self.status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
-
-        # Bind events
-        self.tree.bind("<Button-1>", self.on_tree_click)
-        self.tree.bind("<<TreeviewOpen>>", self.load_children)
-
-        # Initialize
-        self.load_preferences()
-        self.update_status()
-        self.build_tree(self.root_dir)
-
-    def set_default_output_dir(self):
-        folder = filedialog.askdirectory(initialdir=self.default_output_dir)
-        if folder:
-            self.default_output_dir = folder
-            self.save_preferences()
-
-    def show_about(self):
-        messagebox.showinfo("About", "File Merger with Tree Select\nVersion 1.1\nCreated by [Your Name]")
-
-    def show_user_guide(self):
-        guide_window = tk.Toplevel(self.root)
-        guide_window.title("User Guide")
-        guide_window.geometry("600x400")
-        text_widget = tk.Text(guide_window, wrap=tk.WORD)
-        text_widget.pack(fill=tk.BOTH, expand=True)
-        text_widget.insert(tk.END, "User Guide\n\n")
-        text_widget.insert(tk.END, "1. Select Root Folder: Choose the directory to merge files from.\n")
-        text_widget.insert(tk.END, "2. Use the search bar to find specific files or folders.\n")
-        text_widget.insert(tk.END, "3. Check boxes to select files for merging.\n")
-        text_widget.insert(tk.END, "4. Use 'Preview Merge' to review the output.\n")
-        text_widget.insert(tk.END, "5. Click 'Merge Files' to save the merged content.\n")
-        text_widget.insert(tk.END, "6. Configure preferences via the Preferences menu.\n")
-        text_widget.config(state=tk.DISABLED)
-
-    def search_tree(self, event):
-        search_term = self.search_entry.get().lower()
-        if not search_term:
-            for item in self.tree.get_children(""):
-                self.tree.item(item, tags=self.tree.item(item, "tags"))
-            return
+class MergeStats:
+    """Per-phase timings and counters collected while a merge runs.
+
+    files_scanned counts file entries visited by the file selection walk
+    and structure_files_scanned those visited by the structure walk, so a
+    file seen by both is counted once in each; files_merged counts files
+    written to the report. Each cache has its own hit counter: scan stats
+    reused (stat_cache_hits), detected encodings reused
+    (encoding_cache_hits) and formatted content served from memory
+    (block_cache_hits). bytes_written is the uncompressed export
+    up to, but not including, the statistics section. bytes_on_disk is the
+    final size of the output file, compression and statistics included;
+    it is only known once the file is closed, so the report itself never
+    shows it.
+    """
+    COUNTERS = ['files_scanned', 'structure_files_scanned', 'files_merged', 'stats_issued',
+                'bytes_read', 'bytes_written', 'decode_fallbacks', 'stat_cache_hits',
+                'encoding_cache_hits', 'block_cache_hits']
+
+    def __init__(self):
+        self.started = datetime.datetime.now().isoformat()
+        self.phases = {}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.bytes_on_disk = None
+        self._start = time.perf_counter()
+        self.elapsed = 0.0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Accumulate wall time spent inside the block under `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self._start
+        return self
+
+    def format_report(self):
+        """Human readable summary used in the merge report and the stats view"""
+        elapsed = self.elapsed or time.perf_counter() - self._start
+        lines = [f"• Elapsed: {elapsed:.3f}s"]
+        lines += [f"• Phase {name}: {seconds:.3f}s" for name, seconds in self.phases.items()]
+        lines += [f"• {name.replace('_', ' ').capitalize()}: {value:,}"
+                  for name, value in self.counters.items()]
+        if self.bytes_on_disk is not None:
+            lines.append(f"• Bytes on disk: {self.bytes_on_disk:,}")
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return {
+            'started': self.started,
+            'elapsed': self.elapsed,
+            'phases': dict(self.phases),
+            'counters': dict(self.counters),
+            'bytes_on_disk': self.bytes_on_disk,
+        }
 
-        def search_item(item):
-            text = self.tree.item(item, "text").lower()
-            if search_term in text:
-                self.tree.item(item, tags=("highlight",))
-                return True
-            else:
-                self.tree.item(item, tags=self.tree.item(item, "tags"))
-                for child in self.tree.get_children(item):
-                    if search_item(child):
-                        return True
-                return False
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
 
-        for item in self.tree.get_children(""):
-            search_item(item)
+def detect_encoding(file_path):
+    """Attempt different encodings with fallback"""
+    encodings = ['utf-8', 'latin-1', 'cp1252']
+    for encoding in encodings:
+        try:
+            with open(file_path, 'r', encoding=encoding) as test_file:
+                test_file.read(1024)
+                return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'  # Final fallback
+
+READ_BLOCK_SIZE = 1 << 18
+OUTPUT_BUFFER_SIZE = 1 << 20
+PREFIX_SEGMENT = 1000
+
+_LOW_PREFIXES = [f"{n:03d}| " for n in range(PREFIX_SEGMENT)]
+
+@functools.lru_cache(maxsize=64)
+def _prefix_segment(width, segment):
+    """Newline-led line number prefixes for one run of PREFIX_SEGMENT lines"""
+    if width < 4:
+        first = segment * PREFIX_SEGMENT
+        return tuple(f"\n{n:0{width}d}| " for n in range(first, first + PREFIX_SEGMENT))
+    # Every prefix in the run shares its leading digits; a single join and
+    # split attaches them to the 000-999 table without per-line formatting
+    lead = f"\x00\n{segment:0{width - 3}d}"
+    return tuple(lead.join([''] + _LOW_PREFIXES).split('\x00')[1:])
+
+def _line_prefixes(first, count, width):
+    prefixes = []
+    n, end = first, first + count
+    while n < end:
+        segment, offset = divmod(n, PREFIX_SEGMENT)
+        take = min(PREFIX_SEGMENT - offset, end - n)
+        prefixes.extend(_prefix_segment(width, segment)[offset:offset + take])
+        n += take
+    return prefixes
+
+def number_lines(chunks, width=4, start=1):
+    """Prefix each line in a stream of text chunks with its line number.
+
+    Output matches f"{n:0{width}d}| {line}" line by line. Each chunk is
+    split on '\n' in one go and the prefixes, which carry the preceding
+    newline, come from cached tables, so a whole block is interleaved and
+    joined without any per-line formatting.
+    """
+    line_num = start
+    pending = []
+    for chunk in chunks:
+        if '\n' not in chunk:
+            pending.append(chunk)
+            continue
+        if pending:
+            pending.append(chunk)
+            chunk = ''.join(pending)
+            pending = []
+        lines = chunk.split('\n')
+        tail = lines.pop()
+        if tail:
+            pending.append(tail)
+        parts = [None] * (2 * len(lines) + 1)
+        parts[0:-1:2] = _line_prefixes(line_num, len(lines), width)
+        parts[0] = parts[0][1:]
+        parts[1::2] = lines
+        parts[-1] = '\n'
+        yield ''.join(parts)
+        line_num += len(lines)
+    if pending:
+        yield f"{line_num:0{width}d}| " + ''.join(pending)
+
+def count_lines(file_path, buffer_size=READ_BLOCK_SIZE):
+    """Upper bound on the number of lines in a file, for any newline style"""
+    count = 1
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(buffer_size)
+            if not block:
+                break
+            count += block.count(b'\n') + block.count(b'\r') - block.count(b'\r\n')
+    return count
+
+def line_number_width(file_path, width):
+    """Resolve a configured width; 0 sizes the numbers to the file's line count"""
+    if width:
+        return width
+    return max(4, len(str(count_lines(file_path))))
+
+def iter_file_chunks(infile, include_line_numbers=False, buffer_size=READ_BLOCK_SIZE, width=4):
+    """Yield the text of an open file in chunks, optionally line numbered"""
+    def blocks():
+        while True:
+            chunk = infile.read(buffer_size)
+            if not chunk:
+                break
+            yield chunk
+    if include_line_numbers:
+        yield from number_lines(blocks(), width)
+    else:
+        yield from blocks()
+
+class OutputError(Exception):
+    """Writing the export failed, e.g. a full disk or a disconnected client.
+
+    Deliberately not an OSError, so per-file read error handling in the
+    merge never mistakes it for an unreadable input file.
+    """
+
+class StreamOutput(io.RawIOBase):
+    """Binary sink that counts the bytes it forwards to another stream.
+
+    The stream is only closed with the sink when owns_stream is set, so a
+    caller's socket or file stays open after the merge.
+    """
+
+    def __init__(self, stream, owns_stream=False):
+        self.stream = stream
+        self.owns_stream = owns_stream
+        self.bytes_written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        try:
+            self.stream.write(data)
+        except OSError as e:
+            raise OutputError(f"Could not write export output: {str(e)}") from e
+        self.bytes_written += len(data)
+        return len(data)
+
+    def flush(self):
+        if not self.closed:
+            try:
+                self.stream.flush()
+            except OSError as e:
+                raise OutputError(f"Could not write export output: {str(e)}") from e
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            if self.owns_stream:
+                self.stream.close()
+
+def open_output(output, compression=None):
+    """Open a path or binary stream for streaming text, compressing with gzip or zstd if requested"""
+    stream = None
+    if hasattr(output, 'write'):
+        stream = output if isinstance(output, StreamOutput) else StreamOutput(output)
+    if compression == 'gzip':
+        raw = gzip.GzipFile(fileobj=stream, mode='wb') if stream else gzip.open(output, 'wb')
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd output requires the 'zstandard' package")
+        raw = zstandard.ZstdCompressor().stream_writer(stream or open(output, 'wb'), closefd=True)
+    elif compression in (None, 'none'):
+        raw = stream or open(output, 'wb', buffering=0)
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    # Count uncompressed bytes, and batch small writes before they reach
+    # the compressor, file or socket
+    counter = StreamOutput(raw, owns_stream=True)
+    return io.TextIOWrapper(io.BufferedWriter(counter, OUTPUT_BUFFER_SIZE), encoding='utf-8')
+
+def output_bytes_written(outfile):
+    """Uncompressed bytes written so far to a file from open_output"""
+    outfile.flush()
+    return outfile.buffer.raw.bytes_written
+
+class MergeFormatter:
+    """Streaming writer for one output format.
+
+    The merge drives the hooks in order: begin, write_structure, then
+    begin_file / write_chunk / end_file per file, and finally end. Content
+    arrives in chunks, so no formatter ever holds a whole file or export.
+    """
+    extension = '.txt'
+
+    def __init__(self, outfile):
+        self.outfile = outfile
+
+    def begin(self, metadata):
+        pass
+
+    def write_structure(self, structure):
+        pass
+
+    def begin_file(self, idx, total, file_path, file_stats, encoding):
+        pass
+
+    def write_chunk(self, text):
+        self.outfile.write(text)
+
+    def write_error(self, message):
+        """Report a read error inside the current file block"""
+        self.outfile.write(f"\n{message}\n")
+
+    def end_file(self):
+        pass
+
+    def skip_file(self, file_path, message):
+        """Report a file that could not be processed at all"""
+        pass
+
+    def end(self, merge_stats):
+        pass
+
+class TextFormatter(MergeFormatter):
+    """The original '#'-banner plain-text report"""
+
+    def begin(self, metadata):
+        self.outfile.write(f"FILE MERGE REPORT\n{'='*40}\n")
+        self.outfile.write(f"• Generated: {metadata['start_time']}\n")
+        self.outfile.write(f"• Total files: {metadata['file_count']}\n")
+        self.outfile.write(f"• Total size: {metadata['total_size']:,} bytes\n")
+        self.outfile.write('='*40 + '\n\n')
+
+    def write_structure(self, structure):
+        self.outfile.write(f"FILE STRUCTURE OVERVIEW\n{'='*40}\n")
+        self.outfile.write(structure)
+        self.outfile.write("\n\n" + "="*40 + "\n\n")
+
+    def begin_file(self, idx, total, file_path, file_stats, encoding):
+        header = [
+            f"{'#'*40}",
+            f"### FILE {idx}/{total}: {os.path.basename(file_path)}",
+            f"• Path: {file_path}",
+            f"• Size: {file_stats.st_size:,} bytes",
+            f"• Modified: {datetime.datetime.fromtimestamp(file_stats.st_mtime).isoformat()}",
+            f"{'#'*40}\n\n"
+        ]
+        self.outfile.write('\n'.join(header))
+
+    def end_file(self):
+        self.outfile.write(f"\n{'#'*40}\n### END OF FILE\n{'#'*40}\n\n")
+
+    def skip_file(self, file_path, message):
+        self.outfile.write(f"\n[ERROR PROCESSING FILE: {message}]\n")
+
+    def end(self, merge_stats):
+        # Timings are only known once every file is written, so the
+        # stats section closes the report rather than opening it
+        self.outfile.write(f"MERGE STATISTICS\n{'='*40}\n")
+        self.outfile.write(merge_stats.format_report())
+        self.outfile.write('\n' + '='*40 + '\n')
+
+class JsonlFormatter(MergeFormatter):
+    """One JSON record per file: path, size, mtime, encoding and content"""
+    extension = '.jsonl'
+
+    def begin_file(self, idx, total, file_path, file_stats, encoding):
+        self.error = None
+        record = json.dumps({
+            'path': file_path,
+            'size': file_stats.st_size,
+            'mtime': datetime.datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
+            'encoding': encoding,
+        }, ensure_ascii=False)
+        # Leave the content string open so chunks can be streamed into it
+        self.outfile.write(record[:-1] + ', "content": "')
+
+    def write_chunk(self, text):
+        # Each chunk is escaped on its own; the escaped pieces concatenate
+        # into one valid JSON string
+        self.outfile.write(json.dumps(text, ensure_ascii=False)[1:-1])
+
+    def write_error(self, message):
+        self.error = message
+
+    def end_file(self):
+        self.outfile.write('"')
+        if self.error:
+            self.outfile.write(', "error": ' + json.dumps(self.error, ensure_ascii=False))
+        self.outfile.write('}\n')
+
+    def skip_file(self, file_path, message):
+        self.outfile.write(json.dumps({'path': file_path, 'error': message}, ensure_ascii=False) + '\n')
+
+# Characters XML 1.0 does not allow anywhere in a document, even escaped
+XML_FORBIDDEN = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+def xml_text(text):
+    """Escape text for XML, replacing forbidden control characters with U+FFFD"""
+    return xml_escape(XML_FORBIDDEN.sub('\ufffd', text))
+
+def xml_attr(value):
+    return quoteattr(XML_FORBIDDEN.sub('\ufffd', value))
+
+class XmlFormatter(MergeFormatter):
+    """XML-tagged export with one <file> element per file.
+
+    Control characters XML 1.0 forbids (e.g. form feeds, NULs in binaries)
+    are written as U+FFFD so the document always parses.
+    """
+    extension = '.xml'
+
+    def begin(self, metadata):
+        self.outfile.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        self.outfile.write(
+            f"<export generated={xml_attr(metadata['start_time'])} "
+            f"file_count=\"{metadata['file_count']}\" total_size=\"{metadata['total_size']}\">\n")
+
+    def write_structure(self, structure):
+        self.outfile.write(f"<structure>\n{xml_text(structure)}\n</structure>\n")
+
+    def begin_file(self, idx, total, file_path, file_stats, encoding):
+        modified = datetime.datetime.fromtimestamp(file_stats.st_mtime).isoformat()
+        self.outfile.write(
+            f"<file index=\"{idx}\" path={xml_attr(file_path)} size=\"{file_stats.st_size}\" "
+            f"modified={xml_attr(modified)} encoding={xml_attr(encoding)}>\n")
+
+    def write_chunk(self, text):
+        self.outfile.write(xml_text(text))
+
+    def write_error(self, message):
+        self.outfile.write(f"<error>{xml_text(message)}</error>")
+
+    def end_file(self):
+        self.outfile.write("\n</file>\n")
+
+    def skip_file(self, file_path, message):
+        self.outfile.write(f"<file path={xml_attr(file_path)}><error>{xml_text(message)}</error></file>\n")
+
+    def end(self, merge_stats):
+        self.outfile.write(f"<stats>\n{xml_text(merge_stats.format_report())}\n</stats>\n</export>\n")
+
+class MarkdownFormatter(MergeFormatter):
+    """Markdown export with each file in a fenced code block"""
+    extension = '.md'
+
+    def begin(self, metadata):
+        self.outfile.write("# File Merge Report\n\n")
+        self.outfile.write(f"- Generated: {metadata['start_time']}\n")
+        self.outfile.write(f"- Total files: {metadata['file_count']}\n")
+        self.outfile.write(f"- Total size: {metadata['total_size']:,} bytes\n\n")
+
+    def write_structure(self, structure):
+        fence = '`' * max(3, longest_backtick_run(structure) + 1)
+        self.outfile.write(f"## File Structure\n\n{fence}\n{structure}\n{fence}\n\n")
+
+    def begin_file(self, idx, total, file_path, file_stats, encoding):
+        # The fence must be longer than any backtick run inside the file;
+        # a cheap binary pre-scan finds it without buffering the content
+        self.fence = '`' * max(3, scan_backtick_run(file_path) + 1)
+        language = os.path.splitext(file_path)[1].lstrip('.')
+        self.outfile.write(f"## {idx}/{total}: {file_path}\n\n{self.fence}{language}\n")
+        self.at_line_start = True
+
+    def write_chunk(self, text):
+        self.outfile.write(text)
+        self.at_line_start = text.endswith('\n')
+
+    def end_file(self):
+        if not self.at_line_start:
+            self.outfile.write('\n')
+        self.outfile.write(f"{self.fence}\n\n")
+
+    def skip_file(self, file_path, message):
+        self.outfile.write(f"## {file_path}\n\n> Error processing file: {message}\n\n")
+
+    def end(self, merge_stats):
+        self.outfile.write("## Merge Statistics\n\n")
+        self.outfile.write(merge_stats.format_report().replace('• ', '- ') + '\n')
+
+def longest_backtick_run(text):
+    return max((len(run) for run in re.findall('`+', text)), default=0)
+
+def scan_backtick_run(file_path, buffer_size=65536):
+    """Longest run of backticks in a file, read in binary blocks"""
+    longest = carry = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(buffer_size)
+            if not block:
+                break
+            runs = re.findall(b'`+', block)
+            if not runs:
+                carry = 0
+                continue
+            # Runs may straddle block boundaries
+            first = len(runs[0]) + carry if block.startswith(b'`') else len(runs[0])
+            longest = max(longest, first, *(len(run) for run in runs))
+            carry = len(runs[-1]) if block.endswith(b'`') else 0
+            if len(runs) == 1 and block.startswith(b'`') and block.endswith(b'`'):
+                carry = first
+    return longest
+
+MERGE_FORMATTERS = {
+    'text': TextFormatter,
+    'jsonl': JsonlFormatter,
+    'xml': XmlFormatter,
+    'markdown': MarkdownFormatter,
+}
+
+COMPRESSION_EXTENSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+DEFAULT_IGNORED_FILETYPES = [".scml", ".pyc", ".pyo", ".pyd"]
+DEFAULT_IGNORED_DIRECTORIES = ["__pycache__", ".git", ".vscode"]
+
+class ScanCache:
+    """In-memory snapshot of directory listings and file stats.
+
+    One scan of a tree can serve several exports: walk() replays os.walk
+    from memory and stat() answers without touching the disk. Anything
+    outside the scanned roots falls back to the filesystem.
+    """
+
+    def __init__(self):
+        self.listings = {}
+        self.file_stats = {}
+
+    def scan(self, top, pruned_directories=()):
+        top = os.path.abspath(top)
+        pending = [top]
+        while pending:
+            root = pending.pop()
+            dirs, files = [], []
+            try:
+                with os.scandir(root) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                if entry.name in pruned_directories:
+                                    continue
+                                dirs.append(entry.name)
+                                # Match os.walk: list symlinked dirs but don't descend
+                                if not entry.is_symlink():
+                                    pending.append(entry.path)
+                            else:
+                                files.append(entry.name)
+                                self.file_stats[entry.path] = entry.stat()
+                        except OSError:
+                            # Broken symlinks stay listed, like os.walk, but unstatted
+                            continue
+            except OSError:
+                continue
+            self.listings[root] = (dirs, files)
+        return self
 
-    def load_children(self, event):
-        item = self.tree.focus()
-        if not item:
-            return
-        # Get the full path from the item's tags
-        full_path = self.tree.item(item, "tags")[1]
-        # Check for placeholder children and delete them
-        children = self.tree.get_children(item)
-        if children and self.tree.item(children[0], "text") == "Loading...":
-            self.tree.delete(children[0])
-            # Dynamically load the actual contents
-            self.process_directory(full_path, item)
-
-    def preview_merge(self):
-        files = self.get_selected_files()
-        if not files:
-            messagebox.showwarning("No Selection", "No files selected")
+    def walk(self, top):
+        """Top-down os.walk replacement; pruning `dirs` in place is honoured"""
+        if top not in self.listings:
+            yield from os.walk(top)
             return
+        pending = [top]
+        while pending:
+            root = pending.pop()
+            dirs, files = self.listings[root]
+            dirs = list(dirs)
+            yield root, dirs, list(files)
+            pending.extend(os.path.join(root, d) for d in reversed(dirs)
+                           if os.path.join(root, d) in self.listings)
+
+    def stat(self, path):
+        return self.file_stats.get(path)
+
+class ContentCache:
+    """Detected encodings and, optionally, formatted content blocks per file.
+
+    Entries are keyed by path, size and mtime, so a changed file simply
+    misses. Content blocks are only kept when max_block_bytes is set; the
+    budget is the in-memory size of the stored strings and their lists as
+    reported by sys.getsizeof, and is kept by evicting the least recently
+    used files.
+    """
+
+    def __init__(self, max_entries=100000, max_block_bytes=0):
+        self.max_entries = max_entries
+        self.max_block_bytes = max_block_bytes
+        self.encodings = collections.OrderedDict()
+        self.blocks = collections.OrderedDict()
+        self.block_bytes = 0
+        self.lock = threading.Lock()
+
+    def encoding(self, file_path, file_stats, merge_stats):
+        key = (file_path, file_stats.st_size, file_stats.st_mtime_ns)
+        with self.lock:
+            encoding = self.encodings.get(key)
+            if encoding is not None:
+                self.encodings.move_to_end(key)
+                merge_stats.count('encoding_cache_hits')
+                return encoding
+        encoding = detect_encoding(file_path)
+        with self.lock:
+            self.encodings[key] = encoding
+            if len(self.encodings) > self.max_entries:
+                self.encodings.popitem(last=False)
+        return encoding
+
+    def accepts_block(self, size):
+        # A single file may take at most a sixteenth of the budget
+        return 0 < size <= self.max_block_bytes // 16
+
+    def get_block(self, key, merge_stats):
+        with self.lock:
+            entry = self.blocks.get(key)
+            if entry is None:
+                return None
+            self.blocks.move_to_end(key)
+            merge_stats.count('block_cache_hits')
+            return entry[0]
+
+    def put_block(self, key, chunks, size):
+        """Store chunks whose measured size (chunks plus list) is size bytes"""
+        with self.lock:
+            if key in self.blocks:
+                return
+            self.blocks[key] = (chunks, size)
+            self.block_bytes += size
+            while self.block_bytes > self.max_block_bytes and self.blocks:
+                _, (_, evicted_size) = self.blocks.popitem(last=False)
+                self.block_bytes -= evicted_size
+
+class FileMerger:
+    """Merge engine without GUI state, shared by the app and batch exports"""
+
+    def __init__(self, ignored_filetypes=DEFAULT_IGNORED_FILETYPES,
+                 ignored_directories=DEFAULT_IGNORED_DIRECTORIES,
+                 include_structure=True, include_ignored_in_structure=True,
+                 include_line_numbers=False, output_format='text', compression='none',
+                 line_number_width=4, scan_cache=None, content_cache=None):
+        if output_format not in MERGE_FORMATTERS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.ignored_filetypes = list(ignored_filetypes)
+        self.ignored_directories = list(ignored_directories)
+        self.include_structure = include_structure
+        self.include_ignored_in_structure = include_ignored_in_structure
+        self.include_line_numbers = include_line_numbers
+        self.line_number_width = line_number_width
+        self.output_format = output_format
+        self.compression = compression
+        self.scan_cache = scan_cache
+        self.content_cache = content_cache
+
+    def walk(self, top):
+        if self.scan_cache is not None:
+            return self.scan_cache.walk(top)
+        return os.walk(top)
+
+    def stat(self, file_path, merge_stats):
+        if self.scan_cache is not None:
+            file_stats = self.scan_cache.stat(file_path)
+            if file_stats is not None:
+                merge_stats.count('stat_cache_hits')
+                return file_stats
+        merge_stats.count('stats_issued')
+        return os.stat(file_path)
+
+    def detect_encoding(self, file_path, file_stats, merge_stats):
+        with merge_stats.phase('encoding'):
+            if self.content_cache is not None:
+                return self.content_cache.encoding(file_path, file_stats, merge_stats)
+            return detect_encoding(file_path)
+
+    def collect_files(self, root, include=(), exclude=(), merge_stats=None):
+        """Files under root that pass the ignore lists and include/exclude globs.
+
+        Patterns are matched against the '/'-separated path relative to root
+        and against the bare file name.
+        """
+        def matches(rel_path, patterns):
+            name = rel_path.rsplit('/', 1)[-1]
+            return any(fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+        merge_stats = merge_stats or MergeStats()
+        root = os.path.abspath(root)
+        selected = []
+        for dirpath, dirs, walk_files in self.walk(root):
+            dirs[:] = [d for d in dirs if d not in self.ignored_directories]
+            merge_stats.count('files_scanned', len(walk_files))
+            for f in walk_files:
+                _, ext = os.path.splitext(f.lower())
+                if ext in self.ignored_filetypes:
+                    continue
+                full_path = os.path.join(dirpath, f)
+                rel_path = os.path.relpath(full_path, root).replace(os.sep, '/')
+                if include and not matches(rel_path, include):
+                    continue
+                if exclude and matches(rel_path, exclude):
+                    continue
+                selected.append(full_path)
+        return sorted(selected, key=lambda p: os.path.relpath(p, root).lower().split(os.sep))
 
-        preview_window = tk.Toplevel(self.root)
-        preview_window.title("Merge Preview")
-        preview_window.geometry("800x600")
-        text_widget = tk.Text(preview_window, wrap=tk.WORD)
-        text_widget.pack(fill=tk.BOTH, expand=True)
-
-        if self.include_structure.get():
-            structure = self.generate_file_structure(files)
-            text_widget.insert(tk.END, f"FILE STRUCTURE OVERVIEW\n{'='*40}\n")
-            text_widget.insert(tk.END, structure)
-            text_widget.insert(tk.END, "\n\n" + "="*40 + "\n\n")
-
-        total = len(files)
-        for idx, file_path in enumerate(files, 1):
-            header = f"\n{'#' * 40}\n### {idx}/{total}: {os.path.basename(file_path)}\n{'#' * 40}\n\n"
-            text_widget.insert(tk.END, header)
-            try:
-                with open(file_path, "r", encoding="utf-8") as infile:
-                    if self.include_line_numbers.get():
-                        for line_num, line in enumerate(infile, 1):
-                            text_widget.insert(tk.END, f"{line_num:04d}| {line}")
-                    else:
-                        text_widget.insert(tk.END, infile.read())
-            except UnicodeDecodeError:
-                with open(file_path, "r", encoding="latin-1") as infile:
-                    if self.include_line_numbers.get():
-                        for line_num, line in enumerate(infile, 1):
-                            text_widget.insert(tk.END, f"{line_num:04d}| {line}")
-                    else:
-                        text_widget.insert(tk.END, infile.read())
-            except Exception as e:
-                logging.error(f"Error reading {file_path}: {str(e)}")
-                text_widget.insert(tk.END, f"Error reading {file_path}: {str(e)}\n")
-            footer = f"\n{'#' * 40}\n### END: {os.path.basename(file_path)}\n{'#' * 40}\n\n"
-            text_widget.insert(tk.END, footer)
-        text_widget.config(state=tk.DISABLED)
-
-    def update_status(self):
-        if self.ignored_filetypes:
-            self.status_var.set(f"Ignoring: {', '.join(self.ignored_filetypes)}")
-        else:
-            self.status_var.set("Showing all file types")
-
-    def generate_file_structure(self, files):
+    def generate_file_structure(self, files, merge_stats=None):
         if not files:
             return "No files selected"
+        merge_stats = merge_stats or MergeStats()
+        selected = set(files)
         base_path = os.path.commonpath(files)
         structure = [f"📁 ROOT: {os.path.basename(base_path)}/", 
                     f"📌 Location: {base_path}", "┄"*50]
@@ -310,7 +702,7 @@ class FileMergerApp:
             'dir_count': 0
         }
 
-        for root, dirs, walk_files in os.walk(base_path):
+        for root, dirs, walk_files in self.walk(base_path):
             # Clean up ignored directories
             dirs[:] = [d for d in dirs if d not in self.ignored_directories]
             
@@ -323,6 +715,8 @@ class FileMergerApp:
                 dir_name = os.path.basename(root)
                 structure.append(f"{'│   '*(depth-1)}└── 📁 {dir_name}/")
 
+            merge_stats.count('structure_files_scanned', len(walk_files))
+
             # Process files with visual indicators
             for f in sorted(walk_files):
                 full_path = os.path.join(root, f)
@@ -330,15 +724,15 @@ class FileMergerApp:
                 
                 if ext in self.ignored_filetypes:
                     stats['ignored_ext'][ext] += 1
-                    if self.include_ignored_in_structure.get():  # New condition
+                    if self.include_ignored_in_structure:
                         structure.append(f"{'│   '*depth}└── ❌ {f} [IGNORED: {ext}]")
                     continue
                 else:
                     stats['total_files'] += 1
-                    if full_path in files:
+                    if full_path in selected:
                         structure.append(
                             f"{'│   '*depth}└── ✅ 📄 {f} "
-                            f"[Size: {os.path.getsize(full_path):,} bytes]"
+                            f"[Size: {self.stat(full_path, merge_stats).st_size:,} bytes]"
                         )
                     else:
                         stats['excluded_files'] += 1
@@ -358,399 +752,669 @@ class FileMergerApp:
         
         return '\n'.join(structure)
 
-    def generate_file_structure_old(self, files):
-        if not files:
-            return "No files selected"
-        base_path = os.path.commonpath(files)
-        structure = [f"📁 ROOT: {os.path.basename(base_path)}/", f"📌 Location: {base_path}", "┄"*50]
-        stats = {'total_files': 0, 'included_files': len(files), 'ignored_ext': collections.defaultdict(int), 'dir_count': 0}
-        dir_map = collections.defaultdict(list)
-        for path in files:
-            rel_path = os.path.relpath(path, base_path)
-            parts = rel_path.split(os.sep)
-            for i in range(1, len(parts)):
-                dir_path = os.path.join(base_path, *parts[:i])
-                dir_map[dir_path].append(os.path.join(*parts[:i+1]))
-        for root, dirs, files in os.walk(base_path):
-            dirs[:] = [d for d in dirs if d not in self.ignored_directories]
-            rel_root = os.path.relpath(root, base_path)
-            depth = rel_root.count(os.sep) + 1 if rel_root != '.' else 0
-            if root != base_path:
-                stats['dir_count'] += 1
-                dir_name = os.path.basename(root)
-                structure.append(f"{'│   '*(depth-1)}└── 📁 {dir_name}/")
-            for f in sorted(files):
-                full_path = os.path.join(root, f)
-                _, ext = os.path.splitext(f)
-                if full_path not in files:
-                    stats['ignored_ext'][ext] += 1
-                    continue
-                line = [f"{'│   '*depth}└── 📄 {f}", f" [Size: {os.path.getsize(full_path):,} bytes]"]
-                structure.append(''.join(line))
-                stats['total_files'] += 1
-        structure.extend(["\n" + "┄"*50, "📊 STATISTICS:", f"• Included files: {stats['included_files']}",
-                          f"• Directories scanned: {stats['dir_count']}", f"• Ignored extensions: {sum(stats['ignored_ext'].values())}",
-                          "⚡ Ignored breakdown:"] + [f"  - {k}: {v}" for k, v in stats['ignored_ext'].items()])
-        return '\n'.join(structure)
-
-    def edit_filetypes(self):
-        dialog = FileTypeDialog(self.root, self.ignored_filetypes)
-        self.root.wait_window(dialog)
-        if dialog.result is not None:
-            self.ignored_filetypes = dialog.result
-            self.save_preferences()
-            if self.root_dir:
-                self.build_tree(self.root_dir)
-            self.update_status()
-
-    def load_preferences(self):
-        try:
-            with open("filemerger_prefs.json", "r") as f:
-                preferences = json.load(f)
-                if "include_ignored_in_structure" in preferences:
-                    self.include_ignored_in_structure.set(
-                        preferences["include_ignored_in_structure"]
-                    )
-                self.ignored_filetypes = preferences.get("ignored_filetypes", self.ignored_filetypes)
-                self.saved_path_states = preferences.get("selected_paths", {})
-                self.default_output_dir = preferences.get("default_output_dir", os.getcwd())
-                if "include_line_numbers" in preferences:
-                    self.include_line_numbers.set(preferences["include_line_numbers"])
-                if "include_structure" in preferences:
-                    self.include_structure.set(preferences["include_structure"])
-                self.default_output_dir = preferences.get("default_output_dir") or os.getcwd()
-                self.root_dir = preferences.get("root_dir") or os.getcwd()
-                if not os.path.exists(self.root_dir):
-                    self.root_dir = os.getcwd()
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.root_dir = os.getcwd()
-            self.default_output_dir = os.getcwd()
-            self.saved_path_states = {}
-
-    def save_preferences(self):
-        print("self.root_dir",self.root_dir)
-        preferences = {
-            "ignored_filetypes": self.ignored_filetypes,
-            "include_ignored_in_structure": self.include_ignored_in_structure.get(),
-            "include_line_numbers": self.include_line_numbers.get(),
-            "include_structure": self.include_structure.get(),
-            "root_dir": self.root_dir,
-            "default_output_dir": self.default_output_dir,
-            "selected_paths": {self.tree.item(item_id, "tags")[1]: state for item_id, state in self.check_states.items()
-                               if state and self.tree.exists(item_id) and len(self.tree.item(item_id, "tags")) >= 2}
-        }
-        with open("filemerger_prefs.json", "w") as f:
-            json.dump(preferences, f, indent=2)
-
-    def restore_selections(self):
-        if not hasattr(self, 'saved_path_states'):
-            return
-        def process_item(item_id):
-            tags = self.tree.item(item_id, "tags")
-            if len(tags) >= 2 and tags[1] in self.saved_path_states and self.saved_path_states[tags[1]]:
-                self.check_states[item_id] = True
-                self.tree.item(item_id, values=("☑"))
-            for child_id in self.tree.get_children(item_id):
-                process_item(child_id)
-        for root_item in self.tree.get_children(""):
-            process_item(root_item)
-        for item_id in self.check_states:
-            if self.check_states[item_id]:
-                self.update_parents(item_id)
-
-    def select_root(self):
-        folder = filedialog.askdirectory(initialdir=self.default_output_dir)
-        if folder:
-            self.root_dir = folder
-            self.build_tree(folder)
-
-    def build_tree(self, path):
-        self.tree.delete(*self.tree.get_children())
-        self.check_states.clear()
-        root_id = self.add_node("", os.path.basename(path), path, "folder")
-        self.process_directory(path, root_id, initial=True)
-        self.restore_selections()
-
-    def add_node(self, parent, text, full_path, node_type):
-        count = len(self.tree.get_children(parent))
-        tag = 'oddrow' if count % 2 == 0 else 'evenrow'
-        node_id = self.tree.insert(
-            parent, "end",
-            text=text,
-            values=("☐"),
-            tags=(node_type, full_path, tag)
-        )
-        self.check_states[node_id] = False
-
-        state = self.saved_path_states.get(full_path, False)
-        self.check_states[node_id] = state
-        self.tree.item(node_id, values=("☑" if state else "☐"))
-
-        if node_type == "folder":
-            self.tree.insert(node_id, "end", text="Loading...")
-        return node_id
-
-    def process_directory(self, path, parent_id, initial=False):
-        try:
-            entries = sorted(os.listdir(path), key=lambda x: x.lower())
-            for entry in entries:
-                full_path = os.path.join(path, entry)
-                # Only process valid directories
-                if os.path.isdir(full_path) and entry not in self.ignored_directories:
-                    self.add_node(parent_id, entry, full_path, "folder")
-                # Process files if they are not ignored
-                elif os.path.isfile(full_path):
-                    _, ext = os.path.splitext(entry.lower())
-                    if ext not in self.ignored_filetypes:
-                        self.add_node(parent_id, entry, full_path, "file")
-        except PermissionError:
-            pass
-
-    def on_tree_click(self, event):
-        region = self.tree.identify_region(event.x, event.y)
-        if region != "cell" or self.tree.identify_column(event.x) != "#1":
-            return
-        item = self.tree.identify_row(event.y)
-        current_state = self.check_states.get(item, False)
-        new_state = not current_state
-        self.check_states[item] = new_state
-        self.tree.item(item, values=("☑" if new_state else "☐"))
-        if self.tree.item(item, "tags")[0] == "folder":
-            self.toggle_children(item, new_state)
-        self.update_parents(item)
-        self.save_preferences()
-
-    def toggle_children(self, parent, state):
-        children = list(self.tree.get_children(parent))  # Create static list
-        
-        for child in children:
-            # Skip non-existent items (may have been deleted)
-            if not self.tree.exists(child):
-                continue
-                
-            # Handle "Loading..." placeholder
-            if self.tree.item(child, "text") == "Loading...":
-                self.tree.delete(child)
-                continue
-                
-            # Process actual children
-            try:
-                full_path = self.tree.item(child, "tags")[1]
-                if os.path.isdir(full_path):
-                    # Load children if not already loaded
-                    if not self.tree.get_children(child):
-                        self.process_directory(full_path, child)
-                    self.toggle_children(child, state)
-                    
-                self.check_states[child] = state
-                self.tree.item(child, values=("☑" if state else "☐"))
-            except Exception as e:
-                logging.error(f"Error toggling {child}: {str(e)}")
-                continue
-
-
-    def update_parents(self, child):
-        parent = self.tree.parent(child)
-        if not parent:
-            return
-        children = self.tree.get_children(parent)
-        states = [self.check_states[c] for c in children if self.tree.item(c, "text") != "Loading..."]
-        for index, child_item in enumerate(children):
-            tag = 'oddrow' if index % 2 == 0 else 'evenrow'
-            current_tags = list(self.tree.item(child_item)['tags'])
-            if 'oddrow' in current_tags:
-                current_tags.remove('oddrow')
-            if 'evenrow' in current_tags:
-                current_tags.remove('evenrow')
-            current_tags.append(tag)
-            self.tree.item(child_item, tags=current_tags)
-        if not states:
-            return
-        if all(states):
-            new_state = True
-        elif any(states):
-            new_state = "mixed"
-        else:
-            new_state = False
-        current_parent_state = self.check_states[parent]
-        if new_state != current_parent_state and new_state != "mixed":
-            self.check_states[parent] = new_state
-            self.tree.item(parent, values=("☑" if new_state else "☐"))
-            self.update_parents(parent)
-        elif new_state == "mixed":
-            self.tree.item(parent, values=("☒"))
-
-    def get_selected_files(self):
-        return [self.tree.item(item, "tags")[1] for item in self.check_states
-                if self.check_states[item] and "file" in self.tree.item(item, "tags") and not self.tree.get_children(item)]
-
-    def write_content(self, file_path, outfile):
-        """Helper method to handle file content writing"""
-        BUFFER_SIZE = 4096  # 4KB chunks for memory efficiency
-        
-        def handle_encoding(file_path):
-            """Attempt different encodings with fallback"""
-            encodings = ['utf-8', 'latin-1', 'cp1252']
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as test_file:
-                        test_file.read(1024)
-                        return encoding
-                except UnicodeDecodeError:
-                    continue
-            return 'latin-1'  # Final fallback
-        
-        encoding = handle_encoding(file_path)
-        
+    def write_content(self, file_path, formatter, encoding, merge_stats=None, file_stats=None):
+        """Helper method to stream file content through the formatter"""
+        merge_stats = merge_stats or MergeStats()
+        block_key = kept = None
+        if (file_stats is not None and self.content_cache is not None
+                and self.content_cache.max_block_bytes):
+            block_key = (file_path, file_stats.st_size, file_stats.st_mtime_ns,
+                         encoding, self.include_line_numbers, self.line_number_width)
+            cached = self.content_cache.get_block(block_key, merge_stats)
+            if cached is not None:
+                with merge_stats.phase('write'):
+                    for chunk in cached:
+                        formatter.write_chunk(chunk)
+                return
+            kept = []
+            kept_size = 0
         try:
-            with open(file_path, 'r', encoding=encoding) as infile:
-                if self.include_line_numbers.get():
-                    buffer = []
-                    for line_num, line in enumerate(infile, 1):
-                        buffered_line = f"{line_num:04d}| {line}"
-                        buffer.append(buffered_line)
-                        # Write in chunks to handle large files
-                        if len(buffer) >= 100:
-                            outfile.write(''.join(buffer))
-                            buffer = []
-                    # Write remaining lines
-                    if buffer:
-                        outfile.write(''.join(buffer))
-                else:
-                    while True:
-                        chunk = infile.read(BUFFER_SIZE)
-                        if not chunk:
-                            break
-                        outfile.write(chunk)
-        except Exception as e:
+            width = 4
+            if self.include_line_numbers:
+                width = line_number_width(file_path, self.line_number_width)
+            with merge_stats.phase('write'), open(file_path, 'r', encoding=encoding) as infile:
+                for chunk in iter_file_chunks(infile, self.include_line_numbers, width=width):
+                    formatter.write_chunk(chunk)
+                    if kept is not None:
+                        # Stop keeping as soon as the block outgrows its share
+                        kept.append(chunk)
+                        kept_size += sys.getsizeof(chunk)
+                        if not self.content_cache.accepts_block(kept_size):
+                            kept = None
+                merge_stats.count('bytes_read', infile.buffer.tell())
+            if kept is not None:
+                kept_size += sys.getsizeof(kept)
+                self.content_cache.put_block(block_key, kept, kept_size)
+        except (OSError, UnicodeDecodeError) as e:
+            # Only input errors are reported inline; OutputError propagates
             error_msg = f"Error reading {file_path}: {str(e)}"
             logging.error(error_msg)
-            outfile.write(f"\n{error_msg}\n")
-
-    def format_line_numbers(self, text):
-        """Format text with line numbers if enabled"""
-        if self.include_line_numbers.get():
-            return '\n'.join(
-                f"{idx:04d}| {line}" 
-                for idx, line in enumerate(text.split('\n'), 1)
-            )
-        return text
-
-    def merge_files(self):
-        files = self.get_selected_files()
-        if not files:
-            messagebox.showwarning("No Selection", "No files selected")
-            return
-
-        output_file = filedialog.asksaveasfilename(
-            initialdir=self.default_output_dir,
-            defaultextension=".txt",
-            filetypes=[("Text Files", "*.txt")]
-        )
-        
-        if output_file:
+            formatter.write_error(error_msg)
+
+    def export(self, files, output_path, progress_callback=None, profile=False,
+               write_stats_file=False, merge_stats=None):
+        """Merge files into output_path and return the collected MergeStats"""
+        merge_stats = merge_stats or MergeStats()
+        if profile:
+            profiler = cProfile.Profile()
             try:
-                # Add progress callback for UI updates
-                def progress_callback(current, total):
-                    self.status_var.set(f"Merging {current}/{total} files...")
-                    self.root.update_idletasks()
-                
-                self._perform_merge(files, output_file, progress_callback)
-                messagebox.showinfo("Success", 
-                    f"Merged {len(files)} files successfully!\nSaved to: {output_file}")
-            except PermissionError as e:
-                logging.error(f"Permission denied: {str(e)}")
-                messagebox.showerror("Permission Error", 
-                    f"Cannot write to {output_file}:\n{str(e)}")
-            except Exception as e:
-                logging.error(f"Merge failed: {traceback.format_exc()}")
-                messagebox.showerror("Merge Error", 
-                    f"Critical error during merge:\n{str(e)}")
+                profiler.runcall(self.merge, files, output_path, merge_stats, progress_callback)
             finally:
-                self.status_var.set("Ready")
-
-    def _perform_merge(self, files, output_path, progress_callback=None):
-        """Core merge functionality with enhanced features"""
-        merge_metadata = {
-            'start_time': datetime.datetime.now().isoformat(),
-            'file_count': len(files),
-            'total_size': sum(os.path.getsize(f) for f in files)
-        }
-        
+                profiler.dump_stats(output_path + ".prof")
+        else:
+            self.merge(files, output_path, merge_stats, progress_callback)
+
+        merge_stats.bytes_on_disk = os.path.getsize(output_path)
+        merge_stats.finish()
+        if write_stats_file:
+            merge_stats.write_json(output_path + ".stats.json")
+        return merge_stats
+
+    def merge(self, files, output_path, merge_stats, progress_callback=None):
+        """Write the merge report, recording timings and counters in merge_stats.
+
+        output_path may also be a binary stream, which is left open.
+        """
+        with merge_stats.phase('metadata'):
+            merge_metadata = {
+                'start_time': merge_stats.started,
+                'file_count': len(files),
+                'total_size': sum(self.stat(f, merge_stats).st_size for f in files)
+            }
+
         try:
-            with open(output_path, "w", encoding="utf-8") as outfile:
-                # Write merge header with metadata
-                outfile.write(f"FILE MERGE REPORT\n{'='*40}\n")
-                outfile.write(f"• Generated: {merge_metadata['start_time']}\n")
-                outfile.write(f"• Total files: {merge_metadata['file_count']}\n")
-                outfile.write(f"• Total size: {merge_metadata['total_size']:,} bytes\n")
-                outfile.write('='*40 + '\n\n')
-
-                if self.include_structure.get():
-                    structure = self.generate_file_structure(files)
-                    outfile.write(f"FILE STRUCTURE OVERVIEW\n{'='*40}\n")
-                    outfile.write(structure)
-                    outfile.write("\n\n" + "="*40 + "\n\n")
+            with open_output(output_path, self.compression) as outfile:
+                formatter = MERGE_FORMATTERS[self.output_format](outfile)
+                formatter.begin(merge_metadata)
+
+                if self.include_structure:
+                    with merge_stats.phase('structure'):
+                        structure = self.generate_file_structure(files, merge_stats)
+                    formatter.write_structure(structure)
 
                 for idx, file_path in enumerate(files, 1):
                     if progress_callback:
                         progress_callback(idx, len(files))
                     
+                    file_open = False
                     try:
-                        file_stats = os.stat(file_path)
-                        header = [
-                            f"{'#'*40}",
-                            f"### FILE {idx}/{len(files)}: {os.path.basename(file_path)}",
-                            f"• Path: {file_path}",
-                            f"• Size: {file_stats.st_size:,} bytes",
-                            f"• Modified: {datetime.datetime.fromtimestamp(file_stats.st_mtime).isoformat()}",
-                            f"{'#'*40}\n\n"
-                        ]
-                        outfile.write('\n'.join(header))
-                        
-                        # Enhanced content writing with buffer
-                        self.write_content(file_path, outfile)
-                        
-                        outfile.write(f"\n{'#'*40}\n### END OF FILE\n{'#'*40}\n\n")
+                        file_stats = self.stat(file_path, merge_stats)
+                        encoding = self.detect_encoding(file_path, file_stats, merge_stats)
+                        if encoding != 'utf-8':
+                            merge_stats.count('decode_fallbacks')
+
+                        formatter.begin_file(idx, len(files), file_path, file_stats, encoding)
+                        file_open = True
+                        self.write_content(file_path, formatter, encoding, merge_stats, file_stats)
+                        file_open = False
+                        formatter.end_file()
+                        merge_stats.count('files_merged')
+                    except OutputError:
+                        raise
                     except Exception as e:
                         logging.error(f"Failed to process {file_path}: {str(e)}")
-                        outfile.write(f"\n[ERROR PROCESSING FILE: {str(e)}]\n")
+                        # A record begin_file opened must be closed to stay well-formed
+                        if file_open:
+                            formatter.write_error(str(e))
+                            formatter.end_file()
+                        else:
+                            formatter.skip_file(file_path, str(e))
                         continue
 
+                merge_stats.counters['bytes_written'] = output_bytes_written(outfile)
+                formatter.end(merge_stats)
+
         except IOError as e:
             logging.error(f"File system error: {str(e)}")
             raise RuntimeError(f"Could not write to output file: {str(e)}")
 
-    def auto_save_merge(self):
-        files = self.get_selected_files()
+MERGER_OPTIONS = ('ignored_filetypes', 'ignored_directories', 'include_structure',
+                  'include_ignored_in_structure', 'include_line_numbers',
+                  'line_number_width', 'output_format', 'compression')
+
+LIST_OPTIONS = ('include', 'exclude', 'ignored_filetypes', 'ignored_directories')
+FLAG_OPTIONS = ('include_structure', 'include_ignored_in_structure', 'include_line_numbers',
+                'profile', 'write_stats_file')
+JOB_KEYS = frozenset(MERGER_OPTIONS + LIST_OPTIONS + (
+    'name', 'root', 'output', 'profile', 'write_stats_file'))
+
+def validate_options(options, allowed, where):
+    """Reject unknown keys and option values of the wrong type"""
+    if not isinstance(options, dict):
+        raise ValueError(f"{where} must be a JSON object")
+    unknown = sorted(set(options) - set(allowed))
+    if unknown:
+        raise ValueError(f"{where} has unknown keys: {', '.join(unknown)}")
+    for key in LIST_OPTIONS:
+        value = options.get(key)
+        if value is not None and not (isinstance(value, list)
+                                      and all(isinstance(item, str) for item in value)):
+            raise ValueError(f"{where}: '{key}' must be a list of strings")
+    for key in FLAG_OPTIONS:
+        if key in options and not isinstance(options[key], bool):
+            raise ValueError(f"{where}: '{key}' must be true or false")
+    width = options.get('line_number_width', 0)
+    # bool is an int subclass, so rule it out explicitly
+    if isinstance(width, bool) or not isinstance(width, int) or width < 0:
+        raise ValueError(f"{where}: 'line_number_width' must be a whole number of at least 0")
+
+def load_job_spec(spec_path):
+    """Read a batch job file and resolve each job against its defaults.
+
+    The file is JSON: {"defaults": {...}, "summary": "path.json",
+    "jobs": [{"name", "root", "output", "include", "exclude", ...}]}.
+    Any FileMerger option (see MERGER_OPTIONS) may appear in defaults or
+    in a job, as may "profile" and "write_stats_file". Relative paths are
+    resolved against the job file's directory.
+    """
+    with open(spec_path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    validate_options(spec, ('defaults', 'summary', 'jobs'), spec_path)
+    base_dir = os.path.dirname(os.path.abspath(spec_path))
+    defaults = spec.get('defaults', {})
+    validate_options(defaults, JOB_KEYS - {'name'}, f"'defaults' in {spec_path}")
+    jobs = []
+    for index, entry in enumerate(spec.get('jobs', []), 1):
+        validate_options(entry, JOB_KEYS, f"Job {index} in {spec_path}")
+        job = dict(defaults)
+        job.update(entry)
+        if 'root' not in job or 'output' not in job:
+            raise ValueError(f"Job {index} in {spec_path} needs both 'root' and 'output'")
+        job['root'] = os.path.abspath(os.path.join(base_dir, job['root']))
+        job['output'] = os.path.abspath(os.path.join(base_dir, job['output']))
+        job.setdefault('name', os.path.basename(job['root']))
+        jobs.append(job)
+    if spec.get('summary'):
+        spec['summary'] = os.path.abspath(os.path.join(base_dir, spec['summary']))
+    return spec, jobs
+
+def scan_job_roots(jobs):
+    """Scan every distinct root once, skipping roots nested inside another job's root"""
+    scan_cache = ScanCache()
+    top_roots = []
+    for root in sorted({job['root'] for job in jobs}):
+        if not any(os.path.commonpath([root, top]) == top for top in top_roots):
+            top_roots.append(root)
+    # Only directories every job ignores can be left out of the shared scan
+    pruned = None
+    for job in jobs:
+        ignored = set(job.get('ignored_directories', DEFAULT_IGNORED_DIRECTORIES))
+        pruned = ignored if pruned is None else pruned & ignored
+    for root in top_roots:
+        scan_cache.scan(root, pruned or ())
+    return scan_cache
+
+def run_job(job, scan_cache=None, content_cache=None):
+    """Export a single batch job and return its summary record"""
+    start = time.perf_counter()
+    result = {'name': job['name'], 'root': job['root'], 'output': job['output'],
+              'status': 'ok', 'files': 0, 'bytes_read': 0, 'bytes_written': 0,
+              'bytes_on_disk': 0}
+    try:
+        merge_stats = MergeStats()
+        merger = FileMerger(scan_cache=scan_cache, content_cache=content_cache,
+                            **{k: job[k] for k in MERGER_OPTIONS if k in job})
+        if not os.path.isdir(job['root']):
+            raise ValueError(f"Root not found: {job['root']}")
+        with merge_stats.phase('select'):
+            files = merger.collect_files(job['root'], job.get('include', ()),
+                                         job.get('exclude', ()), merge_stats)
+        if not files:
+            raise ValueError("No files matched")
+        output_dir = os.path.dirname(job['output'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        merger.export(files, job['output'],
+                      profile=job.get('profile', False),
+                      write_stats_file=job.get('write_stats_file', False),
+                      merge_stats=merge_stats)
+        merged = merge_stats.counters['files_merged']
+        result.update(files=merged,
+                      bytes_read=merge_stats.counters['bytes_read'],
+                      bytes_written=merge_stats.counters['bytes_written'],
+                      bytes_on_disk=merge_stats.bytes_on_disk,
+                      **{name: merge_stats.counters[name] for name in
+                         ('stat_cache_hits', 'encoding_cache_hits', 'block_cache_hits')})
+        if merged < len(files):
+            result.update(status='failed',
+                          error=f"{len(files) - merged} of {len(files)} files could not be merged")
+    except Exception as e:
+        logging.error(f"Batch job {job['name']} failed: {traceback.format_exc()}")
+        result.update(status='failed', error=str(e))
+    result['elapsed'] = time.perf_counter() - start
+    return result
+
+# Per-process state for batch workers: the shared scan arrives once via the
+# pool initializer and the content cache lives for the worker's lifetime
+_batch_scan_cache = None
+_batch_content_cache = ContentCache()
+
+def _init_batch_worker(scan_cache):
+    global _batch_scan_cache
+    _batch_scan_cache = scan_cache
+
+def _run_batch_job(job):
+    return run_job(job, _batch_scan_cache, _batch_content_cache)
+
+def run_batch(spec_path, workers=None):
+    """Run every job in a job file across a process pool and return a summary"""
+    started = datetime.datetime.now().isoformat()
+    start = time.perf_counter()
+    spec, jobs = load_job_spec(spec_path)
+    scan_cache = scan_job_roots(jobs)
+    scan_time = time.perf_counter() - start
+
+    if workers == 1 or len(jobs) <= 1:
+        _init_batch_worker(scan_cache)
+        results = [_run_batch_job(job) for job in jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_batch_worker,
+                initargs=(scan_cache,)) as executor:
+            results = list(executor.map(_run_batch_job, jobs))
+
+    summary = {
+        'spec': os.path.abspath(spec_path),
+        'started': started,
+        'scan_time': scan_time,
+        'elapsed': time.perf_counter() - start,
+        'jobs': results,
+    }
+    if spec.get('summary'):
+        with open(spec['summary'], "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+def format_batch_summary(summary):
+    lines = [f"BATCH EXPORT SUMMARY\n{'='*40}",
+             f"• Jobs: {len(summary['jobs'])}",
+             f"• Shared scan: {summary['scan_time']:.3f}s",
+             f"• Elapsed: {summary['elapsed']:.3f}s",
+             '='*40]
+    for result in summary['jobs']:
+        line = (f"{result['status'].upper():6} {result['name']}: {result['files']} files, "
+                f"{result['bytes_on_disk']:,} bytes on disk in {result['elapsed']:.3f}s")
+        if result['status'] != 'ok':
+            line += f" ({result['error']})"
+        lines.append(line)
+    return '\n'.join(lines)
+
+class ExportService:
+    """Warm state behind the export server: scans, file selections and content caches.
+
+    Scans are kept per (root, ignored directories), at most max_scans of
+    them, and a scan unused for scan_idle_timeout seconds is dropped along
+    with its watch and selections. With watchdog installed a change marks
+    the scan dirty and the next request rescans; otherwise a background
+    thread rescans the cached trees on an interval and swaps in changed ones.
+    """
+
+    def __init__(self, max_concurrent=4, cache_bytes=256 * 1024 * 1024,
+                 poll_interval=5.0, queue_timeout=30.0, max_selections=256,
+                 token=None, loopback_only=True, max_scans=16, scan_idle_timeout=3600.0):
+        self.token = token
+        self.loopback_only = loopback_only
+        self.content_cache = ContentCache(max_block_bytes=cache_bytes)
+        self.scans = collections.OrderedDict()
+        self.max_scans = max_scans
+        self.scan_idle_timeout = scan_idle_timeout
+        self.last_used = {}
+        self.watches = {}
+        self.selections = collections.OrderedDict()
+        self.max_selections = max_selections
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self.observer = None
+        self.stopped = threading.Event()
+        self.requests_served = 0
+
+    def start_watching(self):
+        if WatchdogObserver is not None:
+            self.observer = WatchdogObserver()
+            self.observer.start()
+        threading.Thread(target=self._poll, daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.observer is not None:
+            self.observer.stop()
+
+    def invalidate(self, scan_key):
+        with self.lock:
+            if scan_key in self.scans:
+                self.dirty.add(scan_key)
+
+    @staticmethod
+    def _fingerprint(scan):
+        return scan.listings, {path: (st.st_size, st.st_mtime_ns)
+                               for path, st in scan.file_stats.items()}
+
+    def _evict(self, key):
+        """Drop a scan and everything tied to it; call with the lock held"""
+        self.scans.pop(key, None)
+        self.last_used.pop(key, None)
+        self.dirty.discard(key)
+        root, ignored_directories = key
+        for selection_key in [k for k in self.selections
+                              if k[0] == root and frozenset(k[4]) == ignored_directories]:
+            del self.selections[selection_key]
+        return self.watches.pop(key, None)
+
+    def _unwatch(self, watches):
+        if self.observer is not None:
+            for watch in watches:
+                if watch is not None:
+                    self.observer.unschedule(watch)
+
+    def expire_idle(self):
+        cutoff = time.monotonic() - self.scan_idle_timeout
+        with self.lock:
+            idle = [key for key, used in self.last_used.items() if used < cutoff]
+            watches = [self._evict(key) for key in idle]
+        self._unwatch(watches)
+
+    def _poll(self):
+        while not self.stopped.wait(self.poll_interval):
+            self.expire_idle()
+            if self.observer is not None:
+                continue
+            with self.lock:
+                scans = list(self.scans.items())
+            for key, scan in scans:
+                fresh = ScanCache().scan(key[0], key[1])
+                # Keep the old object when nothing changed so cached
+                # selections, which are tied to it, stay valid; never
+                # resurrect a scan evicted meanwhile
+                if self._fingerprint(fresh) != self._fingerprint(scan):
+                    with self.lock:
+                        if self.scans.get(key) is scan:
+                            self.scans[key] = fresh
+
+    def get_scan(self, root, ignored_directories):
+        key = (root, frozenset(ignored_directories))
+        with self.lock:
+            scan = self.scans.get(key)
+            if scan is not None and key not in self.dirty:
+                self.scans.move_to_end(key)
+                self.last_used[key] = time.monotonic()
+                return scan
+            self.dirty.discard(key)
+        scan = ScanCache().scan(root, key[1])
+        with self.lock:
+            first_scan = key not in self.scans
+            self.scans[key] = scan
+            self.scans.move_to_end(key)
+            self.last_used[key] = time.monotonic()
+            evicted = []
+            while len(self.scans) > self.max_scans:
+                evicted.append(self._evict(next(iter(self.scans))))
+        self._unwatch(evicted)
+        if first_scan and self.observer is not None:
+            watch = self.observer.schedule(_ScanInvalidator(self, key), root, recursive=True)
+            with self.lock:
+                still_cached = self.scans.get(key) is scan
+                if still_cached:
+                    self.watches[key] = watch
+            if not still_cached:
+                self._unwatch([watch])
+        return scan
+
+    def select_files(self, merger, scan, root, include, exclude):
+        key = (root, tuple(include), tuple(exclude),
+               tuple(merger.ignored_filetypes), tuple(merger.ignored_directories))
+        with self.lock:
+            cached = self.selections.get(key)
+            if cached is not None and cached[0] is scan:
+                self.selections.move_to_end(key)
+                return cached[1]
+        files = merger.collect_files(root, include, exclude)
+        with self.lock:
+            self.selections[key] = (scan, files)
+            if len(self.selections) > self.max_selections:
+                self.selections.popitem(last=False)
+        return files
+
+    def prepare(self, request):
+        """Validate an export request and resolve it to a merger and file list"""
+        validate_options(request, MERGER_OPTIONS + LIST_OPTIONS + ('root',), "Request")
+        if not isinstance(request.get('root'), str):
+            raise ValueError("Request needs a 'root'")
+        root = os.path.abspath(request['root'])
+        if not os.path.isdir(root):
+            raise ValueError(f"Root not found: {root}")
+        merger = FileMerger(content_cache=self.content_cache,
+                            **{k: request[k] for k in MERGER_OPTIONS if k in request})
+        merger.scan_cache = self.get_scan(root, merger.ignored_directories)
+        files = self.select_files(merger, merger.scan_cache, root,
+                                  request.get('include', ()), request.get('exclude', ()))
         if not files:
-            messagebox.showwarning("No Selection", "No files selected")
+            raise ValueError("No files matched")
+        return merger, files
+
+    def stream(self, merger, files, stream):
+        """Write the export to a binary stream and return its MergeStats"""
+        sink = StreamOutput(stream)
+        merge_stats = MergeStats()
+        merger.merge(files, sink, merge_stats)
+        with self.lock:
+            self.requests_served += 1
+        return merge_stats.finish()
+
+    def status(self):
+        with self.lock:
+            return {
+                'requests_served': self.requests_served,
+                'scans': len(self.scans),
+                'max_scans': self.max_scans,
+                'selections': len(self.selections),
+                'cached_blocks': len(self.content_cache.blocks),
+                'cached_block_bytes': self.content_cache.block_bytes,
+                'watcher': 'watchdog' if self.observer is not None else 'polling',
+            }
+
+class _ScanInvalidator:
+    """watchdog event handler that marks one scan dirty when the tree changes"""
+
+    # Opened/closed events fire for the server's own reads and change nothing
+    CHANGE_EVENTS = frozenset(['created', 'deleted', 'moved', 'modified'])
+
+    def __init__(self, service, scan_key):
+        self.service = service
+        self.scan_key = scan_key
+
+    def dispatch(self, event):
+        if event.event_type not in self.CHANGE_EVENTS:
             return
-        
-        # Ensure output directory exists
-        output_dir = self.default_output_dir
-        
-        if not os.path.exists(output_dir):
+        # A directory's own modified event only echoes changes to its entries,
+        # which arrive as file events; created/moved directories still count
+        # because files moved in with them raise no events of their own
+        if event.is_directory and event.event_type == 'modified':
+            return
+        self.service.invalidate(self.scan_key)
+
+LOOPBACK_HOSTS = frozenset(['localhost', '127.0.0.1', '::1'])
+
+def is_loopback(host):
+    if host.lower() == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def _host_name(host_header):
+    """Host header without its port, e.g. '[::1]:8765' -> '::1'"""
+    if host_header.startswith('['):
+        return host_header[1:].split(']', 1)[0]
+    return host_header.rsplit(':', 1)[0].lower()
+
+class ExportRequestHandler(http.server.BaseHTTPRequestHandler):
+    """POST /export streams an export; GET /status reports the warm caches.
+
+    The export body is JSON with "root", optional "include"/"exclude" globs
+    and any FileMerger option (see MERGER_OPTIONS). The server can read any
+    file the user can, so a loopback server refuses requests whose Host is
+    not a loopback name (blocking DNS rebinding from web pages), and when
+    a token is configured every request must send "Authorization: Bearer
+    <token>".
+    """
+    server_version = "CodeExport/1.1"
+    CONTENT_TYPES = {
+        'text': 'text/plain; charset=utf-8',
+        'jsonl': 'application/x-ndjson',
+        'xml': 'application/xml',
+        'markdown': 'text/markdown; charset=utf-8',
+    }
+    COMPRESSED_TYPES = {'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+    MAX_REQUEST_BYTES = 1 << 20
+
+    def _check_access(self):
+        service = self.server.service
+        if service.loopback_only and _host_name(self.headers.get('Host', '')) not in LOOPBACK_HOSTS:
+            self._send_json(403, {'error': "Host not allowed"})
+            return False
+        if service.token is not None:
+            supplied = self.headers.get('Authorization', '').encode('utf-8')
+            if not hmac.compare_digest(supplied, f"Bearer {service.token}".encode('utf-8')):
+                self._send_json(401, {'error': "Missing or invalid token"})
+                return False
+        return True
+
+    def do_GET(self):
+        if not self._check_access():
+            return
+        if self.path != '/status':
+            return self._send_json(404, {'error': f"Unknown endpoint: {self.path}"})
+        self._send_json(200, self.server.service.status())
+
+    def do_POST(self):
+        if not self._check_access():
+            return
+        if self.path != '/export':
+            return self._send_json(404, {'error': f"Unknown endpoint: {self.path}"})
+        service = self.server.service
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return self._send_json(400, {'error': "A valid Content-Length is required"})
+        if length > self.MAX_REQUEST_BYTES:
+            self.close_connection = True
+            return self._send_json(413, {'error': "Request body too large"})
+        # Read the body before queueing so a slow client cannot hold a slot
+        body = self.rfile.read(length)
+        # Bound concurrent scans and merges so memory stays flat under load
+        if not service.slots.acquire(timeout=service.queue_timeout):
+            return self._send_json(503, {'error': "Too many concurrent exports"})
+        try:
             try:
-                os.makedirs(output_dir)
-            except Exception as e:
-                messagebox.showerror("Path Error", 
-                    f"Cannot create output directory:\n{str(e)}")
-                return
-        
-        output_file = os.path.join(output_dir, f"code_export.txt")
-        
-        # Reuse existing merge logic
+                merger, files = service.prepare(json.loads(body or b'{}'))
+            except (ValueError, TypeError, OSError) as e:
+                return self._send_json(400, {'error': str(e)})
+
+            self.send_response(200)
+            self.send_header('Content-Type', self.COMPRESSED_TYPES.get(
+                merger.compression, self.CONTENT_TYPES[merger.output_format]))
+            self.send_header('X-Export-Files', str(len(files)))
+            self.end_headers()
+            try:
+                service.stream(merger, files, self.wfile)
+            except (OutputError, OSError, RuntimeError) as e:
+                # Headers are already sent; abort so the slot is freed at once
+                logging.error(f"Export stream failed: {str(e)}")
+                self.close_connection = True
+        finally:
+            service.slots.release()
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info(format % args)
+
+def serve(host='127.0.0.1', port=8765, max_concurrent=4, cache_mb=256, poll_interval=5.0,
+          token=None, max_roots=16, scan_idle=3600.0):
+    """Run the export server until interrupted"""
+    loopback = is_loopback(host)
+    if not loopback and not token:
+        raise ValueError(f"Serving on non-loopback address {host} requires a token")
+    service = ExportService(max_concurrent=max_concurrent,
+                            cache_bytes=cache_mb * 1024 * 1024,
+                            poll_interval=poll_interval,
+                            token=token or None, loopback_only=loopback,
+                            max_scans=max_roots, scan_idle_timeout=scan_idle)
+    service.start_watching()
+    server = http.server.ThreadingHTTPServer((host, port), ExportRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    print(f"Serving exports on http://{host}:{server.server_port}/export")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge files into a single export")
+    parser.add_argument("--batch", metavar="JOB_FILE",
+                        help="run the exports described in a JSON job file without the GUI")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --batch (default: CPU count)")
+    parser.add_argument("--serve", action="store_true",
+                        help="run a local HTTP export server with warm caches")
+    parser.add_argument("--host", default="127.0.0.1", help="address for --serve")
+    parser.add_argument("--port", type=int, default=8765, help="port for --serve")
+    parser.add_argument("--max-concurrent", type=int, default=4,
+                        help="exports --serve runs at once")
+    parser.add_argument("--cache-mb", type=int, default=256,
+                        help="MB of cached file content in --serve, as Python string objects")
+    parser.add_argument("--poll-interval", type=float, default=5.0,
+                        help="seconds between rescans when watchdog is not installed")
+    parser.add_argument("--max-roots", type=int, default=16,
+                        help="directory trees --serve keeps scanned in memory")
+    parser.add_argument("--scan-idle", type=float, default=3600.0,
+                        help="seconds before --serve drops a scan nobody has requested")
+    parser.add_argument("--token", default=os.environ.get("CODE_EXPORT_TOKEN"),
+                        help="bearer token --serve requires from clients; mandatory off "
+                             "loopback (default: $CODE_EXPORT_TOKEN)")
+    args = parser.parse_args(argv)
+
+    if args.serve:
         try:
-            self._perform_merge(files, output_file)
-            messagebox.showinfo("Success", 
-                f"Auto-saved merge to:\n{output_file}")
-        except Exception as e:
-            messagebox.showerror("Merge Error", 
-                f"Failed to create output file:\n{str(e)}")
+            serve(args.host, args.port, args.max_concurrent, args.cache_mb,
+                  args.poll_interval, args.token, args.max_roots, args.scan_idle)
+        except ValueError as e:
+            parser.error(str(e))
+        return 0
 
-
-if __name__ == "__main__":
+    if args.batch:
+        try:
+            summary = run_batch(args.batch, args.workers)
+        except (OSError, ValueError) as e:
+            parser.error(f"invalid job file: {e}")
+        print(format_batch_summary(summary))
+        return 0 if all(r['status'] == 'ok' for r in summary['jobs']) else 1
+
+    # Imported here so --batch and --serve work without tkinter installed
+    import tkinter as tk
+    from code_export_gui import FileMergerApp
     root = tk.Tk()
     app = FileMergerApp(root)
     root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())